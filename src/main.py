@@ -5,12 +5,14 @@ Handles routing, authentication, rate limiting, and request forwarding.
 """
 
 # CI/CD pipeline test - trivial change for main push
-import time
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
+from starlette.applications import Starlette
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.middleware import Middleware
 from fastapi.exceptions import RequestValidationError
 import structlog
 
@@ -25,11 +27,16 @@ from cloudsound_shared.middleware.correlation import CorrelationIDMiddleware
 from cloudsound_shared.logging import configure_logging, get_logger
 from cloudsound_shared.config.settings import app_settings
 
-from .metrics import init_metrics, record_request
+from .metrics import init_metrics, queue_request, start_metrics_worker, stop_metrics_worker
 from .middleware.auth import AuthMiddleware
-from .middleware.rate_limit import RateLimitMiddleware, RateLimitConfig
-from .middleware.proxy import ProxyMiddleware, ServiceRegistry
-from .routes.gateway import router as gateway_router
+from .middleware.rate_limit import RateLimitMiddleware, RateLimitConfig, RateLimiter
+from .middleware.proxy import (
+    ProxyMiddleware,
+    ServiceRegistry,
+    create_proxy_client,
+    create_proxy_routes,
+)
+from .routes.gateway import close_http_client, open_http_client, router as gateway_router
 
 # Configure logging
 configure_logging(log_level=app_settings.log_level, log_format=app_settings.log_format)
@@ -44,6 +51,12 @@ async def lifespan(app: FastAPI):
 
     # Initialize metrics
     init_metrics(app_settings.app_version)
+    start_metrics_worker()
+
+    # Backend client for the proxy, opened per lifespan so a restart never
+    # reuses a closed client
+    proxy_app.state.proxy_client = create_proxy_client(timeout=30.0)
+    open_http_client()
 
     logger.info(
         "api_gateway_started",
@@ -54,6 +67,11 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
+    await stop_metrics_worker()
+    await rate_limiter.aclose()
+    await proxy_app.state.proxy_client.aclose()
+    del proxy_app.state.proxy_client
+    await close_http_client()
     logger.info("api_gateway_shutdown")
 
 
@@ -83,23 +101,40 @@ app.add_middleware(CorrelationIDMiddleware)
 # Authentication middleware
 app.add_middleware(AuthMiddleware)
 
-# Rate limiting middleware
+# Backend service registry
+service_registry = ServiceRegistry()
+
+# Rate limiting middleware. Proxied prefixes are exempt: backends apply
+# their own limits to polling and streaming traffic.
 rate_limit_config = RateLimitConfig(
     requests_per_minute=100,  # 100 requests per minute
     burst_size=20,
-    exempt_routes=("/health", "/metrics", "/docs", "/openapi.json"),
+    exempt_routes=("/health", "/metrics", "/docs", "/openapi.json", *service_registry.routes),
+)
+rate_limiter = RateLimiter(
+    requests_per_minute=rate_limit_config.requests_per_minute,
+    burst_size=rate_limit_config.burst_size,
+)
+app.add_middleware(RateLimitMiddleware, config=rate_limit_config, limiter=rate_limiter)
+
+# Proxy sub-application (forwards to backend services). Routed only for the
+# registered service prefixes so local routes never pass through the proxy.
+# Its backend client is set on proxy_app.state by the lifespan.
+proxy_app = Starlette(
+    middleware=[
+        Middleware(ProxyMiddleware, registry=service_registry),
+    ],
+    exception_handlers={StarletteHTTPException: http_exception_handler},
 )
-app.add_middleware(RateLimitMiddleware, config=rate_limit_config)
-
-# Proxy middleware (forwards to backend services)
-service_registry = ServiceRegistry()
-app.add_middleware(ProxyMiddleware, registry=service_registry, timeout=30.0)
 
 # Exception handlers
 app.add_exception_handler(StarletteHTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
+# Proxy routes come before the routers so backend services keep their prefixes
+app.router.routes.extend(create_proxy_routes(proxy_app, service_registry))
+
 # Include routers
 app.include_router(health_router)
 app.include_router(gateway_router)
@@ -109,16 +144,26 @@ app.include_router(gateway_router)
 @app.middleware("http")
 async def timing_middleware(request: Request, call_next):
     """Record request timing metrics."""
-    start_time = time.time()
+    # The loop's monotonic clock avoids wall-clock jumps
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
 
     response = await call_next(request)
 
-    duration = time.time() - start_time
+    duration = loop.time() - start_time
 
-    # Record metrics
-    record_request(
+    # Label by route template to keep metric cardinality bounded
+    route = request.scope.get("route")
+    if route is not None:
+        path_label = route.path
+    else:
+        route_prefix = service_registry.get_route_prefix(request.url.path)
+        path_label = f"{route_prefix}/__other__" if route_prefix else "__other__"
+
+    # Record metrics off the request path
+    queue_request(
         method=request.method,
-        path=request.url.path,
+        path=path_label,
         status=response.status_code,
         duration=duration,
     )
@@ -170,4 +215,14 @@ async def api_info():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop/httptools come with uvicorn[standard]. Rate-limit buckets, the
+    # health cache and the Prometheus registry are per-process, so running
+    # several workers would need Prometheus multiprocess mode and a shared
+    # rate-limit store; stay on a single worker until those exist.
+    uvicorn.run(
+        "src.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+    )
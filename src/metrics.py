@@ -1,4 +1,9 @@
 """Prometheus metrics for API Gateway."""
+import asyncio
+from contextlib import suppress
+from functools import lru_cache
+from typing import Optional
+
 from prometheus_client import Counter, Histogram, Gauge, Info
 import structlog
 
@@ -20,7 +25,7 @@ REQUESTS_TOTAL = Counter(
 REQUEST_DURATION = Histogram(
     "api_gateway_request_duration_seconds",
     "Request duration in seconds",
-    ["method", "path"],
+    ["method"],
     buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
 )
 
@@ -59,30 +64,98 @@ ACTIVE_CONNECTIONS = Gauge(
 )
 
 
+# Version last published to SERVICE_INFO
+_service_info_version = None
+
+
 def init_metrics(version: str = "1.0.0") -> None:
     """Initialize service metrics."""
+    global _service_info_version
+    
+    if _service_info_version == version:
+        return
+    
     SERVICE_INFO.info({
         "version": version,
         "service": "api-gateway",
     })
+    _service_info_version = version
     logger.info("metrics_initialized", version=version)
 
 
 def record_request(method: str, path: str, status: int, duration: float) -> None:
-    """Record a request."""
-    # Normalize path to avoid cardinality explosion
-    normalized_path = _normalize_path(path)
+    """Record a request.
+    
+    ``path`` must already be a bounded label (route template or an
+    ``__other__`` bucket), never the raw request path.
+    """
+    counter, histogram = _request_metrics(method, path, status)
+    counter.inc()
+    histogram.observe(duration)
+
+
+# Request samples queued by the request path and drained in the background
+_metrics_queue: Optional[asyncio.Queue] = None
+_drain_task: Optional[asyncio.Task] = None
+
+
+def start_metrics_worker(maxsize: int = 10_000) -> None:
+    """Start recording queued request metrics in a background task.
+    
+    Must be called from the running event loop (application startup).
+    """
+    global _metrics_queue, _drain_task
+    _metrics_queue = asyncio.Queue(maxsize)
+    _drain_task = asyncio.create_task(_drain_metrics(_metrics_queue))
+
+
+async def stop_metrics_worker() -> None:
+    """Stop the background worker and record any samples still queued."""
+    global _metrics_queue, _drain_task
+    queue, task = _metrics_queue, _drain_task
+    _metrics_queue = _drain_task = None
+    
+    if task is not None:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
     
-    REQUESTS_TOTAL.labels(
-        method=method,
-        path=normalized_path,
-        status=str(status),
-    ).inc()
+    if queue is not None:
+        while not queue.empty():
+            _record_sample(queue.get_nowait())
+
+
+def queue_request(method: str, path: str, status: int, duration: float) -> None:
+    """Queue a request sample for background recording.
     
-    REQUEST_DURATION.labels(
-        method=method,
-        path=normalized_path,
-    ).observe(duration)
+    Records inline when no worker is running; drops the sample when the
+    queue is full rather than blocking the request.
+    """
+    queue = _metrics_queue
+    if queue is None:
+        record_request(method, path, status, duration)
+        return
+    
+    with suppress(asyncio.QueueFull):
+        queue.put_nowait((method, path, status, duration))
+
+
+async def _drain_metrics(queue: asyncio.Queue) -> None:
+    """Record queued request samples in batches."""
+    while True:
+        _record_sample(await queue.get())
+        
+        # Record whatever else piled up without yielding in between
+        while not queue.empty():
+            _record_sample(queue.get_nowait())
+
+
+def _record_sample(sample: tuple) -> None:
+    """Record one queued sample; a bad sample must not stop the worker."""
+    try:
+        record_request(*sample)
+    except Exception:
+        logger.exception("metrics_record_failed", sample=sample)
 
 
 def record_proxy_request(service: str, status: int, duration: float) -> None:
@@ -101,23 +174,13 @@ def record_auth_attempt(success: bool) -> None:
     AUTH_ATTEMPTS.labels(status="success" if success else "failure").inc()
 
 
-def _normalize_path(path: str) -> str:
-    """Normalize path to reduce metric cardinality.
+@lru_cache(maxsize=10_000)
+def _request_metrics(method: str, path: str, status: int):
+    """Get the labelled request counter and histogram children.
     
-    Replace UUIDs and IDs with placeholders.
+    Cached so the hot path skips prometheus_client's locked label lookup.
     """
-    import re
-    
-    # Replace UUIDs
-    path = re.sub(
-        r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}',
-        '{uuid}',
-        path,
-        flags=re.IGNORECASE,
+    return (
+        REQUESTS_TOTAL.labels(method=method, path=path, status=str(status)),
+        REQUEST_DURATION.labels(method=method),
     )
-    
-    # Replace numeric IDs
-    path = re.sub(r'/\d+(?=/|$)', '/{id}', path)
-    
-    return path
-
@@ -4,10 +4,14 @@ Validates JWT tokens and enforces role-based access control.
 """
 from fastapi import Header, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 from typing import Optional, List
 from dataclasses import dataclass
 from datetime import datetime
+import hashlib
+import re
+import time
+from cachetools import TTLCache
 import jwt
 import structlog
 
@@ -31,6 +35,11 @@ PUBLIC_ROUTES = [
     "/api/v1/search",
 ]
 
+# Single anchored pattern matching any public route prefix on a segment boundary
+_PUBLIC_RE = re.compile(
+    "^(" + "|".join(re.escape(route) for route in PUBLIC_ROUTES) + ")(/|$)"
+)
+
 # Routes that require admin role
 ADMIN_ROUTES = [
     "/api/v1/admin",
@@ -47,18 +56,73 @@ class TokenData:
     exp: Optional[datetime] = None
 
 
-class AuthMiddleware(BaseHTTPMiddleware):
+# Verified tokens keyed by blake2b(token): (TokenData, expires_at)
+_TOKEN_CACHE_TTL = 300  # seconds
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=_TOKEN_CACHE_TTL)
+
+
+def _decode_token(token: str) -> TokenData:
+    """Decode and verify a JWT, reusing the result for repeated tokens.
+    
+    Cached entries never outlive the token's own expiry.
+    
+    Raises:
+        jwt.ExpiredSignatureError: If the token has expired
+        jwt.InvalidTokenError: If the token is invalid
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    
+    cached = _token_cache.get(key)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    
+    payload = jwt.decode(
+        token,
+        app_settings.secret_key,
+        algorithms=[app_settings.jwt_algorithm],
+    )
+    
+    exp = payload.get("exp")
+    token_data = TokenData(
+        user_id=payload.get("sub", ""),
+        email=payload.get("email"),
+        role=payload.get("role", "user"),
+        exp=datetime.fromtimestamp(exp or 0),
+    )
+    
+    expires_at = now + _TOKEN_CACHE_TTL
+    if exp is not None:
+        expires_at = min(expires_at, exp)
+    _token_cache[key] = (token_data, expires_at)
+    
+    return token_data
+
+
+class AuthMiddleware:
     """Middleware for JWT authentication.
     
     Validates tokens on protected routes and adds user info to request state.
+    Implemented as a plain ASGI middleware to avoid the per-request task
+    and stream overhead of BaseHTTPMiddleware.
     """
     
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # Skip auth for public routes
-        path = request.url.path
+        path = scope["path"]
         
         if self._is_public_route(path):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope)
         
         # Get token from header
         auth_header = request.headers.get("Authorization")
@@ -67,7 +131,8 @@ class AuthMiddleware(BaseHTTPMiddleware):
             # Allow request but mark as unauthenticated
             request.state.user = None
             request.state.is_authenticated = False
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
         try:
             token_data = self._verify_token(auth_header)
@@ -85,14 +150,11 @@ class AuthMiddleware(BaseHTTPMiddleware):
             request.state.user = None
             request.state.is_authenticated = False
         
-        return await call_next(request)
+        await self.app(scope, receive, send)
     
     def _is_public_route(self, path: str) -> bool:
         """Check if route is public."""
-        for route in PUBLIC_ROUTES:
-            if path.startswith(route):
-                return True
-        return False
+        return _PUBLIC_RE.match(path) is not None
     
     def _verify_token(self, auth_header: str) -> TokenData:
         """Verify JWT token from Authorization header."""
@@ -105,18 +167,7 @@ class AuthMiddleware(BaseHTTPMiddleware):
         token = auth_header.split(" ", 1)[1]
         
         try:
-            payload = jwt.decode(
-                token,
-                app_settings.secret_key,
-                algorithms=[app_settings.jwt_algorithm],
-            )
-            
-            return TokenData(
-                user_id=payload.get("sub", ""),
-                email=payload.get("email"),
-                role=payload.get("role", "user"),
-                exp=datetime.fromtimestamp(payload.get("exp", 0)),
-            )
+            return _decode_token(token)
             
         except jwt.ExpiredSignatureError:
             raise HTTPException(
@@ -140,14 +191,48 @@ async def require_user(
 ) -> TokenData:
     """Dependency that requires a valid user token.
     
+    Kept async so FastAPI runs it inline on the event loop; sync
+    dependencies are dispatched to the threadpool.
+    
     Usage:
         @app.get("/protected")
         async def protected_route(user: TokenData = Depends(require_user)):
             return {"user_id": user.user_id}
     """
+    return _resolve_user(request)
+
+
+async def require_admin(request: Request) -> TokenData:
+    """Dependency that requires admin role.
+    
+    Usage:
+        @app.post("/admin/action")
+        async def admin_action(user: TokenData = Depends(require_admin)):
+            return {"admin_id": user.user_id}
+    """
+    token_data = _resolve_user(request)
+    
+    if token_data.role != "admin":
+        logger.warning(
+            "admin_required",
+            user_id=token_data.user_id,
+            role=token_data.role,
+            path=request.url.path,
+        )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    
+    return token_data
+
+
+def _resolve_user(request: Request) -> TokenData:
+    """Resolve the authenticated user for a request or raise 401."""
     # Check if already authenticated by middleware
-    if hasattr(request.state, "user") and request.state.user:
-        return request.state.user
+    user = getattr(request.state, "user", None)
+    if user:
+        return user
     
     # Try to get from Authorization header
     auth_header = request.headers.get("Authorization")
@@ -163,17 +248,7 @@ async def require_user(
     token = auth_header.split(" ", 1)[1]
     
     try:
-        payload = jwt.decode(
-            token,
-            app_settings.secret_key,
-            algorithms=[app_settings.jwt_algorithm],
-        )
-        
-        token_data = TokenData(
-            user_id=payload.get("sub", ""),
-            email=payload.get("email"),
-            role=payload.get("role", "user"),
-        )
+        token_data = _decode_token(token)
         
         logger.debug("user_authenticated", user_id=token_data.user_id)
         return token_data
@@ -192,31 +267,6 @@ async def require_user(
         )
 
 
-async def require_admin(request: Request) -> TokenData:
-    """Dependency that requires admin role.
-    
-    Usage:
-        @app.post("/admin/action")
-        async def admin_action(user: TokenData = Depends(require_admin)):
-            return {"admin_id": user.user_id}
-    """
-    token_data = await require_user(request)
-    
-    if token_data.role != "admin":
-        logger.warning(
-            "admin_required",
-            user_id=token_data.user_id,
-            role=token_data.role,
-            path=request.url.path,
-        )
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin privileges required",
-        )
-    
-    return token_data
-
-
 def get_current_user(request: Request) -> Optional[TokenData]:
     """Get current user from request state (non-failing).
     
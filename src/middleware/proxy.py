@@ -4,17 +4,26 @@ Routes requests to appropriate microservices based on URL patterns.
 """
 
 import httpx
-from typing import Optional, Dict, Any
-from urllib.parse import urljoin
+from typing import Optional, Dict, Any, List, Tuple
 from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.background import BackgroundTask
 from starlette.responses import StreamingResponse
+from starlette.routing import BaseRoute, Mount, Route
+from starlette.types import ASGIApp, Receive, Scope, Send
 import structlog
 
 from cloudsound_shared.config.settings import app_settings
 
 logger = structlog.get_logger(__name__)
 
+# Hop-by-hop headers that must not be relayed from backend responses
+_HOP_BY_HOP_HEADERS = frozenset((b"transfer-encoding", b"connection", b"keep-alive"))
+
+# Pre-encoded JSON error bodies
+_ERR_TIMEOUT = b'{"detail": "Service timeout"}'
+_ERR_UNAVAILABLE = b'{"detail": "Service unavailable"}'
+_ERR_INTERNAL = b'{"detail": "Internal gateway error"}'
+
 
 class ServiceRegistry:
     """Registry of backend services and their URLs."""
@@ -29,6 +38,8 @@ class ServiceRegistry:
             "events": app_settings.event_manager_url,
             "admin": app_settings.admin_management_url,
         }
+        # Strip trailing slashes once so paths can be appended directly
+        self.services = {name: url.rstrip("/") for name, url in self.services.items()}
 
         # Route prefix to service mapping
         self.routes: Dict[str, str] = {
@@ -43,6 +54,23 @@ class ServiceRegistry:
             "/api/v1/admin": "admin",
         }
 
+        # (prefix, service URL) pairs, longest prefix first so the most
+        # specific route always wins regardless of insertion order
+        self._ordered = tuple(
+            sorted(
+                ((prefix, self.services[name]) for prefix, name in self.routes.items()),
+                key=lambda item: -len(item[0]),
+            )
+        )
+
+    def route_prefixes(self) -> Tuple[str, ...]:
+        """Get the registered route prefixes.
+
+        Returns:
+            Route prefixes, longest first
+        """
+        return tuple(route_prefix for route_prefix, _ in self._ordered)
+
     def get_service_url(self, path: str) -> Optional[str]:
         """Get service URL for a given path.
 
@@ -52,9 +80,24 @@ class ServiceRegistry:
         Returns:
             Service base URL or None
         """
-        for route_prefix, service_name in self.routes.items():
+        for route_prefix, service_url in self._ordered:
             if path.startswith(route_prefix):
-                return self.services.get(service_name)
+                return service_url
+        return None
+
+    def get_route_prefix(self, path: str) -> Optional[str]:
+        """Get the registered route prefix matching a path.
+
+        Args:
+            path: Request path
+
+        Returns:
+            Matching route prefix or None
+        """
+        # Match on a segment boundary only, like the proxy routes themselves
+        for route_prefix, _ in self._ordered:
+            if path == route_prefix or path.startswith(route_prefix + "/"):
+                return route_prefix
         return None
 
     def get_backend_path(self, path: str) -> str:
@@ -70,7 +113,50 @@ class ServiceRegistry:
         return path
 
 
-class ProxyMiddleware(BaseHTTPMiddleware):
+def create_proxy_client(timeout: float = 30.0) -> httpx.AsyncClient:
+    """Create the pooled HTTP/2 client used to reach backend services.
+
+    Args:
+        timeout: Request timeout in seconds
+
+    Returns:
+        Configured async HTTP client
+    """
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout),
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=1000,
+            max_keepalive_connections=200,
+            keepalive_expiry=60.0,
+        ),
+        # Redirects go back to the caller: streamed request bodies can't be
+        # replayed to a new location
+        follow_redirects=False,
+    )
+
+
+def create_proxy_routes(app: ASGIApp, registry: ServiceRegistry) -> List[BaseRoute]:
+    """Create routes sending each registered prefix to the proxy app.
+
+    Each prefix gets an exact route plus a mount, so both ``/api/v1/concerts``
+    and ``/api/v1/concerts/...`` reach the backend without a slash redirect.
+
+    Args:
+        app: Proxy ASGI application
+        registry: Service registry providing the route prefixes
+
+    Returns:
+        Routes to register ahead of the gateway's own routers
+    """
+    routes: List[BaseRoute] = []
+    for route_prefix in registry.route_prefixes():
+        routes.append(Route(route_prefix, endpoint=app))
+        routes.append(Mount(route_prefix, app=app))
+    return routes
+
+
+class ProxyMiddleware:
     """Middleware for proxying requests to backend services.
 
     Handles:
@@ -78,32 +164,26 @@ class ProxyMiddleware(BaseHTTPMiddleware):
     - Request forwarding with headers
     - Response streaming
     - Error handling
+
+    The backend client (see create_proxy_client) is read from
+    ``state.proxy_client`` on the enclosing application, which opens and
+    closes it with its lifespan.
     """
 
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         registry: Optional[ServiceRegistry] = None,
-        timeout: float = 30.0,
     ):
-        super().__init__(app)
+        self.app = app
         self.registry = registry or ServiceRegistry()
-        self.timeout = timeout
 
-        # Persistent HTTP client
-        self._client: Optional[httpx.AsyncClient] = None
-
-    async def _get_client(self) -> httpx.AsyncClient:
-        """Get or create HTTP client."""
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(
-                timeout=httpx.Timeout(self.timeout),
-                follow_redirects=True,
-            )
-        return self._client
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        path = request.url.path
+        path = scope["path"]
 
         # Check if this path should be proxied
         service_url = self.registry.get_service_url(path)
@@ -111,48 +191,51 @@ class ProxyMiddleware(BaseHTTPMiddleware):
         if not service_url:
             # Not a proxied route, handle locally
             logger.debug("proxy_skip", path=path, reason="not_proxied")
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
-        # Forward to backend service
+        # Forward to backend service; the downstream app is never entered
         logger.debug("proxy_dispatch", path=path, service_url=service_url)
-        return await self._forward_request(request, service_url)
+        client = scope["app"].state.proxy_client
+        response = await self._forward_request(Request(scope, receive), client, service_url)
+        await response(scope, receive, send)
 
     async def _forward_request(
         self,
         request: Request,
+        client: httpx.AsyncClient,
         service_url: str,
     ) -> Response:
         """Forward request to backend service.
 
         Args:
             request: Original request
+            client: Pooled backend HTTP client
             service_url: Backend service base URL
 
         Returns:
             Response from backend
         """
-        client = await self._get_client()
-
-        # Build target URL
+        # Build target URL (service URLs never end with a slash)
         backend_path = self.registry.get_backend_path(request.url.path)
-        target_url = urljoin(service_url, backend_path)
-
-        # Add query string
-        if request.url.query:
-            target_url = f"{target_url}?{request.url.query}"
+        query = request.url.query
+        if query:
+            target_url = f"{service_url}{backend_path}?{query}"
+        else:
+            target_url = service_url + backend_path
 
-        # Forward headers (filter sensitive ones)
-        headers = dict(request.headers)
-        headers.pop("host", None)  # Remove original host
+        # Forward raw header pairs as-is, minus the original host
+        headers = [(k, v) for k, v in request.scope["headers"] if k != b"host"]
 
         # Add forwarding headers
-        headers["X-Forwarded-For"] = self._get_client_ip(request)
-        headers["X-Forwarded-Host"] = request.headers.get("host", "")
-        headers["X-Forwarded-Proto"] = request.url.scheme
+        headers.append((b"x-forwarded-for", self._get_client_ip(request).encode("latin-1")))
+        headers.append((b"x-forwarded-host", request.headers.get("host", "").encode("latin-1")))
+        headers.append((b"x-forwarded-proto", request.scope["scheme"].encode("latin-1")))
 
         # Add correlation ID if present
-        if hasattr(request.state, "correlation_id"):
-            headers["X-Correlation-ID"] = request.state.correlation_id
+        correlation_id = getattr(request.state, "correlation_id", None)
+        if correlation_id is not None:
+            headers.append((b"x-correlation-id", str(correlation_id).encode("latin-1")))
 
         logger.info(
             "proxy_request",
@@ -162,88 +245,100 @@ class ProxyMiddleware(BaseHTTPMiddleware):
         )
 
         try:
-            # Get request body
-            body = await request.body()
+            # Stream the request body through instead of buffering it; bodiless
+            # requests send none so httpx doesn't switch to chunked encoding
+            has_body = (
+                "content-length" in request.headers
+                or "transfer-encoding" in request.headers
+            )
+            body = request.stream() if has_body else None
 
-            # Forward request
-            response = await client.request(
+            # Forward request, streaming the backend response
+            backend_request = client.build_request(
                 method=request.method,
                 url=target_url,
                 headers=headers,
                 content=body,
             )
-
-            # Build response
-            response_headers = dict(response.headers)
-            # Remove hop-by-hop headers
-            for header in ["transfer-encoding", "connection", "keep-alive"]:
-                response_headers.pop(header, None)
+            response = await client.send(backend_request, stream=True)
+
+            # Relay backend headers (lower-cased for ASGI), minus hop-by-hop ones
+            response_headers = [
+                (k.lower(), v)
+                for k, v in response.headers.raw
+                if k.lower() not in _HOP_BY_HOP_HEADERS
+            ]
+
+            # Point backend redirects back at the gateway
+            if response.is_redirect:
+                response_headers = [
+                    (k, self._rewrite_location(v, service_url) if k == b"location" else v)
+                    for k, v in response_headers
+                ]
 
             # Log response details for debugging
-            response_size = len(response.content) if response.content else 0
             logger.info(
                 "proxy_response",
                 path=request.url.path,
                 status=response.status_code,
-                response_size=response_size,
+                response_size=response.headers.get("content-length"),
                 content_type=response.headers.get("content-type"),
             )
 
-            # For events/poll endpoint, log response preview to debug empty responses
-            if "/events/poll" in request.url.path and response_size > 0:
-                try:
-                    import json
-
-                    preview = response.content[:500].decode("utf-8", errors="ignore")
-                    parsed = json.loads(response.content) if response.content else {}
-                    logger.info(
-                        "proxy_response_preview",
-                        path=request.url.path,
-                        preview=preview,
-                        events_fetched=parsed.get("events_fetched")
-                        if isinstance(parsed, dict)
-                        else None,
-                    )
-                except Exception:
-                    pass
-
-            return Response(
-                content=response.content,
+            proxied = StreamingResponse(
+                response.aiter_raw(),
                 status_code=response.status_code,
-                headers=response_headers,
-                media_type=response.headers.get("content-type"),
+                background=BackgroundTask(response.aclose),
             )
+            proxied.raw_headers = response_headers
+            return proxied
 
         except httpx.TimeoutException:
             logger.error("proxy_timeout", target=target_url)
             return Response(
-                content='{"detail": "Service timeout"}',
+                content=_ERR_TIMEOUT,
                 status_code=504,
                 media_type="application/json",
             )
         except httpx.ConnectError:
             logger.error("proxy_connect_error", target=target_url)
             return Response(
-                content='{"detail": "Service unavailable"}',
+                content=_ERR_UNAVAILABLE,
                 status_code=503,
                 media_type="application/json",
             )
         except Exception as e:
-            import traceback
-
             logger.error(
                 "proxy_error",
                 target=target_url,
                 error=str(e),
                 error_type=type(e).__name__,
-                traceback=traceback.format_exc(),
+                exc_info=True,
             )
             return Response(
-                content='{"detail": "Internal gateway error"}',
+                content=_ERR_INTERNAL,
                 status_code=502,
                 media_type="application/json",
             )
 
+    def _rewrite_location(self, location: bytes, service_url: str) -> bytes:
+        """Make a backend redirect target relative to the gateway.
+
+        Backends see the full gateway path, so stripping the backend origin
+        leaves a path the gateway routes straight back to the same service.
+
+        Args:
+            location: Location header value from the backend
+            service_url: Backend service base URL
+
+        Returns:
+            Rewritten Location header value
+        """
+        origin = service_url.encode("latin-1")
+        if location.startswith(origin):
+            return location[len(origin):] or b"/"
+        return location
+
     def _get_client_ip(self, request: Request) -> str:
         """Get client IP from request."""
         forwarded = request.headers.get("X-Forwarded-For")
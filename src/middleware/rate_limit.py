@@ -2,20 +2,26 @@
 
 Implements token bucket algorithm for rate limiting requests.
 """
+import math
 import time
 import asyncio
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from contextlib import suppress
 from dataclasses import dataclass, field
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# Pre-encoded body for rejected requests
+_RATE_LIMIT_BODY = b'{"detail": "Rate limit exceeded. Try again later."}'
 
-@dataclass
+
+@dataclass(slots=True)
 class RateLimitConfig:
     """Configuration for rate limiting."""
     requests_per_minute: int = 60
@@ -32,39 +38,57 @@ class RateLimitConfig:
     )
 
 
-@dataclass
+# Token amounts are scaled by nanoseconds-per-minute, so a bucket refilling at
+# N requests/minute gains exactly N units per elapsed nanosecond (integer math).
+TOKEN_UNITS = 60_000_000_000
+NS_PER_SECOND = 1_000_000_000
+
+# Client buckets are spread over this many independent maps (power of two)
+BUCKET_SHARDS = 32
+
+# Maximum number of evicted buckets kept for reuse
+BUCKET_POOL_SIZE = 1024
+
+# Only one in this many rejections is logged (power of two)
+REJECTION_LOG_SAMPLE = 64
+
+
+@dataclass(slots=True)
 class TokenBucket:
-    """Token bucket for rate limiting."""
-    tokens: float
-    last_update: float
-    capacity: int
-    refill_rate: float  # tokens per second
+    """Token bucket for rate limiting.
     
-    def consume(self, tokens: int = 1) -> bool:
-        """Try to consume tokens. Returns True if successful."""
-        now = time.time()
+    Tokens are integers scaled by TOKEN_UNITS and time is taken from
+    time.monotonic_ns(), so refills are exact and immune to clock jumps.
+    Capacity and refill rate are shared by every bucket of a limiter, so
+    they are passed in rather than stored per client.
+    """
+    tokens: int  # scaled by TOKEN_UNITS
+    last_update: int  # monotonic nanoseconds
+    
+    def consume(self, capacity: int, refill_rate: int, tokens: int = 1) -> bool:
+        """Try to consume tokens. Returns True if successful.
+        
+        Args:
+            capacity: Bucket capacity, scaled by TOKEN_UNITS
+            refill_rate: Scaled units per nanosecond (== requests per minute)
+            tokens: Number of tokens to consume
+        """
+        now = time.monotonic_ns()
         
         # Refill tokens based on time elapsed
         elapsed = now - self.last_update
         self.tokens = min(
-            self.capacity,
-            self.tokens + elapsed * self.refill_rate
+            capacity,
+            self.tokens + elapsed * refill_rate
         )
         self.last_update = now
         
-        if self.tokens >= tokens:
-            self.tokens -= tokens
+        cost = tokens * TOKEN_UNITS
+        if self.tokens >= cost:
+            self.tokens -= cost
             return True
         return False
     
-    def time_until_available(self, tokens: int = 1) -> float:
-        """Calculate time until tokens are available."""
-        if self.tokens >= tokens:
-            return 0
-        
-        needed = tokens - self.tokens
-        return needed / self.refill_rate
-
 
 class RateLimiter:
     """Rate limiter using token bucket algorithm.
@@ -80,26 +104,43 @@ class RateLimiter:
         self,
         requests_per_minute: int = 60,
         burst_size: int = 10,
+        max_buckets: int = 100_000,
     ):
         """Initialize rate limiter.
         
         Args:
             requests_per_minute: Sustained request rate
             burst_size: Maximum burst of requests
+            max_buckets: Maximum number of tracked clients
         """
         self.requests_per_minute = requests_per_minute
         self.burst_size = burst_size
         self.refill_rate = requests_per_minute / 60.0  # per second
+        self._capacity = burst_size * TOKEN_UNITS
+        # Seconds needed to refill one scaled unit, so reset times are a multiply
+        self._seconds_per_unit = 1.0 / (requests_per_minute * NS_PER_SECOND)
+        self.max_buckets = max_buckets
+        
+        # Client buckets sharded by hash(client_id): each shard maps
+        # client_id -> TokenBucket, least recently used first, and holds its
+        # share of max_buckets. Updates are synchronous, so they run
+        # atomically on the event loop.
+        self._shards: List["OrderedDict[str, TokenBucket]"] = [
+            OrderedDict() for _ in range(BUCKET_SHARDS)
+        ]
+        self._shard_capacity = max(1, max_buckets // BUCKET_SHARDS)
         
-        # Client buckets: client_id -> TokenBucket
-        self._buckets: Dict[str, TokenBucket] = {}
-        self._lock = asyncio.Lock()
+        # Total rejections, used to sample rate_limit_exceeded logs
+        self._rejections = 0
         
-        # Cleanup old buckets periodically
+        # Evicted buckets are reset and reissued to cut allocation churn
+        self._bucket_pool: List[TokenBucket] = []
+        
+        # Idle buckets are dropped by a background task, off the request path
         self._cleanup_interval = 300  # 5 minutes
-        self._last_cleanup = time.time()
+        self._cleanup_task: Optional[asyncio.Task] = None
     
-    async def is_allowed(self, client_id: str) -> Tuple[bool, Dict[str, any]]:
+    def is_allowed(self, client_id: str) -> Tuple[bool, Dict[str, any]]:
         """Check if request is allowed for client.
         
         Args:
@@ -108,61 +149,114 @@ class RateLimiter:
         Returns:
             Tuple of (is_allowed, rate_limit_info)
         """
-        async with self._lock:
-            # Cleanup old buckets periodically
-            await self._maybe_cleanup()
-            
-            # Get or create bucket
-            if client_id not in self._buckets:
-                self._buckets[client_id] = TokenBucket(
-                    tokens=float(self.burst_size),
-                    last_update=time.time(),
-                    capacity=self.burst_size,
-                    refill_rate=self.refill_rate,
-                )
-            
-            bucket = self._buckets[client_id]
-            allowed = bucket.consume(1)
+        buckets = self._shards[hash(client_id) & (BUCKET_SHARDS - 1)]
+        
+        # Get or create bucket, marking it most recently used
+        bucket = buckets.get(client_id)
+        if bucket is not None:
+            buckets.move_to_end(client_id)
+        else:
+            bucket = buckets[client_id] = self._acquire_bucket()
             
-            info = {
-                "limit": self.requests_per_minute,
-                "remaining": int(bucket.tokens),
-                "reset": int(bucket.time_until_available()),
-            }
+            # Evict least recently used clients to keep memory bounded
+            while len(buckets) > self._shard_capacity:
+                self._release_bucket(buckets.popitem(last=False)[1])
             
-            if not allowed:
+            self._ensure_cleanup_task()
+        
+        allowed = bucket.consume(self._capacity, self.requests_per_minute)
+        
+        # Derive headers from the state consume() just computed; reset is the
+        # whole seconds until the next token and only matters when rejected
+        tokens = bucket.tokens
+        info = {
+            "limit": self.requests_per_minute,
+            "remaining": tokens // TOKEN_UNITS,
+            "reset": 0 if allowed else math.ceil(
+                (TOKEN_UNITS - tokens) * self._seconds_per_unit
+            ),
+        }
+        
+        if not allowed:
+            # Sample the log so a rejection flood doesn't become a logging flood
+            if self._rejections & (REJECTION_LOG_SAMPLE - 1) == 0:
                 logger.warning(
                     "rate_limit_exceeded",
                     client_id=client_id,
                     remaining=info["remaining"],
+                    rejections=self._rejections + 1,
                 )
-            
-            return allowed, info
+            self._rejections += 1
+        
+        return allowed, info
     
-    async def _maybe_cleanup(self) -> None:
-        """Clean up old buckets to prevent memory growth."""
-        now = time.time()
+    def _acquire_bucket(self) -> TokenBucket:
+        """Get a full bucket, reusing a pooled one when available."""
+        now = time.monotonic_ns()
+        
+        if self._bucket_pool:
+            bucket = self._bucket_pool.pop()
+            bucket.tokens = self._capacity
+            bucket.last_update = now
+            return bucket
         
-        if now - self._last_cleanup < self._cleanup_interval:
+        return TokenBucket(tokens=self._capacity, last_update=now)
+    
+    def _release_bucket(self, bucket: TokenBucket) -> None:
+        """Return an evicted bucket to the pool if there is room."""
+        if len(self._bucket_pool) < BUCKET_POOL_SIZE:
+            self._bucket_pool.append(bucket)
+    
+    def _ensure_cleanup_task(self) -> None:
+        """Start the background cleanup loop if it isn't running."""
+        if self._cleanup_task is not None and not self._cleanup_task.done():
             return
         
-        # Remove buckets that haven't been used recently
-        cutoff = now - self._cleanup_interval
-        old_buckets = [
-            k for k, v in self._buckets.items()
-            if v.last_update < cutoff
-        ]
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Used outside an event loop; the LRU cap still bounds memory
+            return
+        
+        self._cleanup_task = loop.create_task(self._cleanup_loop())
+    
+    async def aclose(self) -> None:
+        """Cancel the background cleanup loop (called on application shutdown)."""
+        task, self._cleanup_task = self._cleanup_task, None
+        if task is None or task.done():
+            return
         
-        for key in old_buckets:
-            del self._buckets[key]
+        task.cancel()
+        if task.get_loop() is asyncio.get_running_loop():
+            with suppress(asyncio.CancelledError):
+                await task
+    
+    async def _cleanup_loop(self) -> None:
+        """Periodically drop idle buckets."""
+        while True:
+            await asyncio.sleep(self._cleanup_interval)
+            self._sweep()
+    
+    def _sweep(self) -> None:
+        """Remove buckets that haven't been used for a cleanup interval."""
+        cutoff = time.monotonic_ns() - self._cleanup_interval * NS_PER_SECOND
+        removed = 0
         
-        self._last_cleanup = now
+        # Shards are ordered least recently used first, so stop at the first
+        # bucket that is still active
+        for buckets in self._shards:
+            while buckets:
+                client_id = next(iter(buckets))
+                if buckets[client_id].last_update >= cutoff:
+                    break
+                self._release_bucket(buckets.pop(client_id))
+                removed += 1
         
-        if old_buckets:
-            logger.debug("rate_limit_buckets_cleaned", count=len(old_buckets))
+        if removed:
+            logger.debug("rate_limit_buckets_cleaned", count=removed)
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """Middleware for rate limiting requests.
     
     Adds rate limit headers to responses and returns 429 when exceeded.
@@ -170,74 +264,95 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         config: Optional[RateLimitConfig] = None,
+        limiter: Optional[RateLimiter] = None,
     ):
-        super().__init__(app)
+        self.app = app
         self.config = config or RateLimitConfig()
-        self.limiter = RateLimiter(
+        self._exempt_prefixes = tuple(self.config.exempt_routes)
+        # The limit never changes, so format its header value once
+        self._limit_str = str(self.config.requests_per_minute)
+        # Pass a limiter in when the caller needs to close it on shutdown
+        self.limiter = limiter or RateLimiter(
             requests_per_minute=self.config.requests_per_minute,
             burst_size=self.config.burst_size,
         )
     
-    async def dispatch(self, request: Request, call_next) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # Skip exempt routes
-        path = request.url.path
+        path = scope["path"]
         if self._is_exempt(path):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
         # Get client identifier
-        client_id = self._get_client_id(request)
+        client_id = self._get_client_id(Request(scope))
         
         # Check rate limit
-        allowed, info = await self.limiter.is_allowed(client_id)
+        allowed, info = self.limiter.is_allowed(client_id)
         
         if not allowed:
-            return Response(
-                content='{"detail": "Rate limit exceeded. Try again later."}',
+            reset = str(info["reset"])
+            response = Response(
+                content=_RATE_LIMIT_BODY,
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 media_type="application/json",
                 headers={
-                    "X-RateLimit-Limit": str(info["limit"]),
+                    "X-RateLimit-Limit": self._limit_str,
                     "X-RateLimit-Remaining": str(info["remaining"]),
-                    "X-RateLimit-Reset": str(info["reset"]),
-                    "Retry-After": str(info["reset"]),
+                    "X-RateLimit-Reset": reset,
+                    "Retry-After": reset,
                 },
             )
+            await response(scope, receive, send)
+            return
         
-        # Process request
-        response = await call_next(request)
+        remaining = str(info["remaining"])
         
-        # Add rate limit headers
-        response.headers["X-RateLimit-Limit"] = str(info["limit"])
-        response.headers["X-RateLimit-Remaining"] = str(info["remaining"])
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Add rate limit headers
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = self._limit_str
+                headers["X-RateLimit-Remaining"] = remaining
+            await send(message)
         
-        return response
+        # Process request
+        await self.app(scope, receive, send_with_headers)
     
     def _is_exempt(self, path: str) -> bool:
         """Check if path is exempt from rate limiting."""
-        for exempt in self.config.exempt_routes:
-            if path.startswith(exempt):
-                return True
-        return False
+        return path.startswith(self._exempt_prefixes)
     
     def _get_client_id(self, request: Request) -> str:
         """Get unique client identifier.
         
-        Uses authenticated user ID if available, otherwise IP.
+        Uses authenticated user ID if available, otherwise IP. The result is
+        cached on request.state.rl_client_id for reuse further down the stack.
         """
-        # Try to get user ID from auth
-        if hasattr(request.state, "user") and request.state.user:
-            return f"user:{request.state.user.user_id}"
-        
-        # Fall back to IP address
-        forwarded = request.headers.get("X-Forwarded-For")
-        if forwarded:
-            return f"ip:{forwarded.split(',')[0].strip()}"
+        client_id = getattr(request.state, "rl_client_id", None)
+        if client_id:
+            return client_id
         
-        client = request.client
-        if client:
-            return f"ip:{client.host}"
+        # Try to get user ID from auth
+        user = getattr(request.state, "user", None)
+        if user:
+            client_id = f"user:{user.user_id}"
+        else:
+            # Fall back to IP address
+            forwarded = request.headers.get("X-Forwarded-For")
+            client = request.client
+            if forwarded:
+                client_id = f"ip:{forwarded.split(',')[0].strip()}"
+            elif client:
+                client_id = f"ip:{client.host}"
+            else:
+                client_id = "unknown"
         
-        return "unknown"
-
+        request.state.rl_client_id = client_id
+        return client_id
@@ -4,9 +4,11 @@ Defines route handlers and aggregation endpoints.
 Some routes are handled directly, others are proxied to backend services.
 """
 from fastapi import APIRouter, Depends, Request, HTTPException
-from typing import Dict, Any, List
+from typing import Dict, Any, Awaitable, List, Optional, Sequence
 import httpx
+import orjson
 import asyncio
+import time
 import structlog
 
 from cloudsound_shared.config.settings import app_settings
@@ -27,6 +29,79 @@ SERVICES = {
     "events": app_settings.event_manager_url,
 }
 
+# Backend endpoint URLs, built once at import
+_URL_RADIO_STATIONS = f"{SERVICES['radio']}/api/v1/radio/stations"
+_URL_CONCERTS = f"{SERVICES['concerts']}/api/v1/concerts"
+_URL_ANALYTICS_HISTORY = f"{SERVICES['analytics']}/api/v1/analytics/history"
+_URL_RADIO_STATS = f"{SERVICES['radio']}/api/v1/radio/stats"
+_URL_CONCERT_STATS = f"{SERVICES['concerts']}/api/v1/concerts/stats"
+_URL_ANALYTICS_STATS = f"{SERVICES['analytics']}/api/v1/analytics/stats"
+_URL_STORAGE_STATS = f"{SERVICES['discovery']}/api/v1/discover/storage/stats"
+_HEALTH_URLS = tuple((name, f"{url}/health") for name, url in SERVICES.items())
+
+# Caps concurrent admin stats calls so bursts queue instead of draining the pool
+MAX_BACKEND_CONCURRENCY = 32
+
+# Shared pooled client so aggregation calls reuse warm backend connections,
+# plus the admin stats semaphore; both are bound to the running lifespan
+_http_client: Optional[httpx.AsyncClient] = None
+_backend_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def open_http_client() -> None:
+    """Create the shared backend client (called on application startup)."""
+    global _http_client, _backend_semaphore
+    _http_client = httpx.AsyncClient(
+        timeout=5.0,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+    )
+    _backend_semaphore = asyncio.Semaphore(MAX_BACKEND_CONCURRENCY)
+
+
+async def close_http_client() -> None:
+    """Close the shared backend client (called on application shutdown)."""
+    global _http_client, _backend_semaphore
+    client = _http_client
+    _http_client = _backend_semaphore = None
+    
+    if client is not None:
+        await client.aclose()
+
+
+async def _gather_within(
+    coros: Sequence[Awaitable[Any]],
+    timeout: float,
+    defaults: Sequence[Any],
+) -> List[Any]:
+    """Run coroutines concurrently under one shared deadline.
+    
+    Calls that finish in time keep their results; stragglers are cancelled
+    and, like calls that raised, replaced by the matching entry in
+    ``defaults``.
+    
+    Args:
+        coros: Coroutines to run
+        timeout: Deadline in seconds for the whole batch
+        defaults: Fallback value for each coroutine, by position
+        
+    Returns:
+        One result per coroutine, in order
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    
+    if pending:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning("backend_deadline_exceeded", pending=len(pending), timeout=timeout)
+    
+    return [
+        task.result() if task in done and task.exception() is None else default
+        for task, default in zip(tasks, defaults)
+    ]
+
 
 @router.get("/gateway/services")
 async def list_services() -> Dict[str, Any]:
@@ -37,18 +112,36 @@ async def list_services() -> Dict[str, Any]:
     }
 
 
+# Health checks: per-service timeout, overall deadline and result cache lifetime
+HEALTH_CHECK_TIMEOUT = httpx.Timeout(2.0)
+HEALTH_CHECK_DEADLINE = 3.0
+HEALTH_CACHE_TTL = 2.0
+
+_health_cache: Dict[str, Any] = {"expires": 0.0, "result": None}
+
+
 @router.get("/gateway/health")
 async def check_services_health() -> Dict[str, Any]:
-    """Check health of all backend services."""
+    """Check health of all backend services.
+    
+    Results are cached for HEALTH_CACHE_TTL seconds so frequent scrapes
+    don't re-probe every backend.
+    """
+    now = time.monotonic()
+    if _health_cache["result"] is not None and now < _health_cache["expires"]:
+        return _health_cache["result"]
+    
     async def check_service(name: str, url: str) -> Dict[str, Any]:
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{url}/health")
-                return {
-                    "name": name,
-                    "status": "healthy" if response.status_code == 200 else "unhealthy",
-                    "code": response.status_code,
-                }
+            response = await _http_client.get(
+                url,
+                timeout=HEALTH_CHECK_TIMEOUT,
+            )
+            return {
+                "name": name,
+                "status": "healthy" if response.status_code == 200 else "unhealthy",
+                "code": response.status_code,
+            }
         except Exception as e:
             return {
                 "name": name,
@@ -56,18 +149,29 @@ async def check_services_health() -> Dict[str, Any]:
                 "error": str(e),
             }
     
-    # Check all services concurrently
-    tasks = [check_service(name, url) for name, url in SERVICES.items()]
-    results = await asyncio.gather(*tasks)
+    # Check all services concurrently, bounded by one deadline
+    results = await _gather_within(
+        [check_service(name, url) for name, url in _HEALTH_URLS],
+        timeout=HEALTH_CHECK_DEADLINE,
+        defaults=[
+            {"name": name, "status": "unavailable", "error": "health check timed out"}
+            for name, _ in _HEALTH_URLS
+        ],
+    )
     
     healthy_count = sum(1 for r in results if r["status"] == "healthy")
     
-    return {
+    result = {
         "services": results,
         "total": len(results),
         "healthy": healthy_count,
         "status": "healthy" if healthy_count == len(results) else "degraded",
     }
+    
+    _health_cache["result"] = result
+    _health_cache["expires"] = time.monotonic() + HEALTH_CACHE_TTL
+    
+    return result
 
 
 @router.get("/gateway/user")
@@ -83,6 +187,27 @@ async def get_current_user(user: TokenData = Depends(require_user)) -> Dict[str,
 
 # Aggregation endpoints - combine data from multiple services
 
+# Overall time budget for one aggregation request
+AGGREGATION_TIMEOUT = 3.0
+
+
+async def _fetch_list(url: str, params: Dict[str, Any], limit: int) -> List[Any]:
+    """Fetch a JSON list from a backend service.
+    
+    Always returns a list of at most ``limit`` items; failures, non-200
+    responses and non-list payloads all yield an empty list.
+    """
+    try:
+        response = await _http_client.get(url, params=params)
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            if isinstance(data, list):
+                return data[:limit]
+    except Exception as e:
+        logger.warning("backend_fetch_failed", url=url, error=str(e))
+    return []
+
+
 @router.get("/home")
 async def get_home_data() -> Dict[str, Any]:
     """Get aggregated data for the home page.
@@ -92,41 +217,18 @@ async def get_home_data() -> Dict[str, Any]:
     - Upcoming concerts
     - Recent activity
     """
-    async def fetch_stations():
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(
-                    f"{SERVICES['radio']}/api/v1/radio/stations",
-                    params={"limit": 6},
-                )
-                if response.status_code == 200:
-                    return response.json()
-        except Exception as e:
-            logger.warning("fetch_stations_failed", error=str(e))
-        return []
-    
-    async def fetch_concerts():
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(
-                    f"{SERVICES['concerts']}/api/v1/concerts",
-                    params={"limit": 6, "upcoming": True},
-                )
-                if response.status_code == 200:
-                    return response.json()
-        except Exception as e:
-            logger.warning("fetch_concerts_failed", error=str(e))
-        return []
-    
-    # Fetch concurrently
-    stations, concerts = await asyncio.gather(
-        fetch_stations(),
-        fetch_concerts(),
+    stations, concerts = await _gather_within(
+        [
+            _fetch_list(_URL_RADIO_STATIONS, {"limit": 6}, limit=6),
+            _fetch_list(_URL_CONCERTS, {"limit": 6, "upcoming": True}, limit=6),
+        ],
+        timeout=AGGREGATION_TIMEOUT,
+        defaults=[[], []],
     )
     
     return {
-        "featured_stations": stations[:6] if isinstance(stations, list) else [],
-        "upcoming_concerts": concerts[:6] if isinstance(concerts, list) else [],
+        "featured_stations": stations,
+        "upcoming_concerts": concerts,
     }
 
 
@@ -141,41 +243,23 @@ async def get_dashboard_data(
     - Recommended stations
     - Saved concerts
     """
-    async def fetch_history():
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(
-                    f"{SERVICES['analytics']}/api/v1/analytics/history",
-                    params={"user_id": user.user_id, "limit": 10},
-                )
-                if response.status_code == 200:
-                    return response.json()
-        except Exception as e:
-            logger.warning("fetch_history_failed", error=str(e))
-        return []
-    
-    async def fetch_recommendations():
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(
-                    f"{SERVICES['radio']}/api/v1/radio/stations",
-                    params={"limit": 4},
-                )
-                if response.status_code == 200:
-                    return response.json()
-        except Exception as e:
-            logger.warning("fetch_recommendations_failed", error=str(e))
-        return []
-    
-    history, recommendations = await asyncio.gather(
-        fetch_history(),
-        fetch_recommendations(),
+    history, recommendations = await _gather_within(
+        [
+            _fetch_list(
+                _URL_ANALYTICS_HISTORY,
+                {"user_id": user.user_id, "limit": 10},
+                limit=10,
+            ),
+            _fetch_list(_URL_RADIO_STATIONS, {"limit": 4}, limit=4),
+        ],
+        timeout=AGGREGATION_TIMEOUT,
+        defaults=[[], []],
     )
     
     return {
         "user_id": user.user_id,
-        "listening_history": history if isinstance(history, list) else [],
-        "recommended_stations": recommendations if isinstance(recommendations, list) else [],
+        "listening_history": history,
+        "recommended_stations": recommendations,
     }
 
 
@@ -187,31 +271,33 @@ async def get_admin_overview(
     
     Combines statistics from all services.
     """
-    async def fetch_stats(service: str, endpoint: str) -> Dict[str, Any]:
+    async def fetch_stats(service: str, url: str) -> Dict[str, Any]:
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                url = f"{SERVICES.get(service, '')}{endpoint}"
-                response = await client.get(url)
-                if response.status_code == 200:
-                    return response.json()
+            async with _backend_semaphore:
+                response = await _http_client.get(url)
+            if response.status_code == 200:
+                return orjson.loads(response.content)
         except Exception as e:
             logger.warning(f"fetch_{service}_stats_failed", error=str(e))
         return {}
     
     # Fetch stats from services
-    results = await asyncio.gather(
-        fetch_stats("radio", "/api/v1/radio/stats"),
-        fetch_stats("concerts", "/api/v1/concerts/stats"),
-        fetch_stats("analytics", "/api/v1/analytics/stats"),
-        fetch_stats("discovery", "/api/v1/discover/storage/stats"),
-        return_exceptions=True,
+    radio, concerts, analytics, storage = await _gather_within(
+        [
+            fetch_stats("radio", _URL_RADIO_STATS),
+            fetch_stats("concerts", _URL_CONCERT_STATS),
+            fetch_stats("analytics", _URL_ANALYTICS_STATS),
+            fetch_stats("discovery", _URL_STORAGE_STATS),
+        ],
+        timeout=AGGREGATION_TIMEOUT,
+        defaults=[{}, {}, {}, {}],
     )
     
     return {
         "admin_id": user.user_id,
-        "radio_stats": results[0] if not isinstance(results[0], Exception) else {},
-        "concert_stats": results[1] if not isinstance(results[1], Exception) else {},
-        "analytics_stats": results[2] if not isinstance(results[2], Exception) else {},
-        "storage_stats": results[3] if not isinstance(results[3], Exception) else {},
+        "radio_stats": radio,
+        "concert_stats": concerts,
+        "analytics_stats": analytics,
+        "storage_stats": storage,
     }
 